@@ -0,0 +1,204 @@
+"""Compare req/s of the production server (src.server) with 1 worker vs N workers.
+
+The load is driven by `oha` or `wrk` when installed, otherwise by a pool of Python
+client processes. The client's CPU use is printed with every run: if it is close to
+the cores it was given, the client and not the server is the bottleneck.
+
+Usage:
+  python benchmarks/bench_workers.py --workers 4 --requests 20000 --concurrency 128
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import httpx
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers: int, port: int, env_file: str) -> subprocess.Popen:
+  """Starts src.server in a subprocess with the given worker count
+
+  Args:
+      workers (int): Number of workers to fork
+      port (int): Port to serve on
+      env_file (str): Path to the .env file the server should load
+
+  Returns:
+      subprocess.Popen: The running server process
+  """
+  env = os.environ.copy()
+  # Access logs would flood the output and make every worker pay for a write per request
+  env.update({'WEB_WORKERS': str(workers), 'APP_PORT': str(port), 'APP_HOST': '127.0.0.1', 'WEB_ACCESS_LOG': 'false'})
+  return subprocess.Popen([sys.executable, '-m', 'src.server', '--env-file', env_file], cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+
+
+def wait_until_ready(server: subprocess.Popen, url: str, timeout: float = 30) -> None:
+  """Polls the url until the server responds
+
+  Args:
+      server (subprocess.Popen): The server process, checked so a crash fails right away
+      url (str): The url to poll
+      timeout (float, optional): Seconds to wait before giving up. Defaults to 30.
+
+  Raises:
+      RuntimeError: Raises if the server exits or does not respond in time
+  """
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    exit_code = server.poll()
+    if exit_code is not None:
+      raise RuntimeError(f"Server exited during startup with exit code {exit_code}")
+    try:
+      httpx.get(url)
+      return
+    except httpx.TransportError:
+      time.sleep(0.2)
+  raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+
+async def run_load(url: str, total: int, concurrency: int) -> None:
+  """Sends `total` GET requests to url with `concurrency` clients in flight
+
+  Args:
+      url (str): The url to hit
+      total (int): Total number of requests to send
+      concurrency (int): Number of concurrent requests
+  """
+  remaining = total
+  limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+  async with httpx.AsyncClient(limits=limits) as client:
+    async def client_loop():
+      nonlocal remaining
+      while remaining > 0:
+        remaining -= 1
+        response = await client.get(url)
+        response.raise_for_status()
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+def client_process(url: str, total: int, concurrency: int) -> float:
+  """Runs run_load in a pool process
+
+  Returns:
+      float: CPU seconds this client used
+  """
+  start = time.process_time()
+  asyncio.run(run_load(url=url, total=total, concurrency=concurrency))
+  return time.process_time() - start
+
+
+def load_with_python(url: str, args: argparse.Namespace) -> tuple[float, float, float]:
+  """Drives the load from args.clients Python processes
+
+  Returns:
+      tuple[float, float, float]: Requests per second, client CPU seconds, wall seconds
+  """
+  concurrency = max(args.concurrency // args.clients, 1)
+  per_client = args.requests // args.clients
+
+  with multiprocessing.Pool(args.clients) as pool:
+    # Warm up so every worker has accepted connections before measuring
+    pool.starmap(client_process, [(url, concurrency * 10, concurrency)] * args.clients)
+    start = time.perf_counter()
+    cpu = pool.starmap(client_process, [(url, per_client, concurrency)] * args.clients)
+    elapsed = time.perf_counter() - start
+
+  return per_client * args.clients / elapsed, sum(cpu), elapsed
+
+
+def load_with_tool(tool: str, url: str, args: argparse.Namespace) -> tuple[float, float, float]:
+  """Drives the load with oha or wrk
+
+  Returns:
+      tuple[float, float, float]: Requests per second, client CPU seconds, wall seconds
+  """
+  if tool == 'oha':
+    cmd = ['oha', '-n', str(args.requests), '-c', str(args.concurrency), '--no-tui', '-j', url]
+  else:
+    cmd = ['wrk', '-t', str(args.clients), '-c', str(args.concurrency), '-d', f"{args.duration}s", url]
+
+  # Warm up so every worker has accepted connections before measuring
+  asyncio.run(run_load(url=url, total=args.concurrency * 10, concurrency=args.concurrency))
+
+  # The server is still running, so only the tool counts towards the reaped children
+  usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+  start = time.perf_counter()
+  output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+  elapsed = time.perf_counter() - start
+  usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+  cpu = (usage_after.ru_utime + usage_after.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime)
+
+  if tool == 'oha':
+    rate = json.loads(output)['summary']['requestsPerSec']
+  else:
+    rate = float(re.search(r"Requests/sec:\s+([\d.]+)", output).group(1))
+  return rate, cpu, elapsed
+
+
+def bench(workers: int, tool: str, args: argparse.Namespace) -> float:
+  """Runs one benchmark pass against a fresh server
+
+  Args:
+      workers (int): Number of workers for this pass
+      tool (str): The load generator, 'python', 'oha' or 'wrk'
+      args (argparse.Namespace): Parsed cli args
+
+  Returns:
+      float: Requests per second
+  """
+  url = f"http://127.0.0.1:{args.port}{args.path}"
+  server = start_server(workers=workers, port=args.port, env_file=args.env_file)
+  try:
+    wait_until_ready(server=server, url=url)
+    if tool == 'python':
+      rate, cpu, elapsed = load_with_python(url=url, args=args)
+    else:
+      rate, cpu, elapsed = load_with_tool(tool=tool, url=url, args=args)
+  finally:
+    server.send_signal(signal.SIGTERM)
+    server.wait()
+
+  print(f"{workers} worker(s): {rate:.0f} req/s, client CPU {cpu / elapsed * 100:.0f}% (100% = one core)", flush=True)
+  return rate
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--workers', type=int, default=len(os.sched_getaffinity(0)), help='N workers to compare against 1')
+  parser.add_argument('--tool', choices=['auto', 'python', 'oha', 'wrk'], default='auto', help='Load generator, auto prefers oha then wrk then python')
+  parser.add_argument('--clients', type=int, default=max(len(os.sched_getaffinity(0)) // 2, 1), help='Client processes (python) or threads (wrk)')
+  parser.add_argument('--requests', type=int, default=20000, help='Requests per run (python, oha)')
+  parser.add_argument('--duration', type=int, default=10, help='Seconds per run (wrk)')
+  parser.add_argument('--concurrency', type=int, default=128)
+  parser.add_argument('--port', type=int, default=8010)
+  parser.add_argument('--path', default='/openapi.json')
+  parser.add_argument('--env-file', default=os.path.join(ROOT_DIR, '.env'))
+  args = parser.parse_args()
+
+  tool = args.tool
+  if tool == 'auto':
+    tool = next((name for name in ('oha', 'wrk') if shutil.which(name)), 'python')
+  print(f"Load generator: {tool}", flush=True)
+
+  results = {}
+  for workers in sorted({1, args.workers}):
+    results[workers] = bench(workers=workers, tool=tool, args=args)
+
+  if len(results) > 1:
+    print(f"Speedup {args.workers} vs 1 worker(s): {results[args.workers] / results[1]:.2f}x")
+
+
+if __name__ == '__main__':
+  main()
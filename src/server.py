@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.config import HTTP_PROTOCOLS, LOOP_SETUPS
+from uvicorn.importer import ImportFromStringError, import_from_string
+from uvicorn.main import STARTUP_FAILURE
+
+
+logger = logging.getLogger("uvicorn.error")
+
+# Signals the parent handles itself, blocked around fork() so no handler runs mid-spawn
+SHUTDOWN_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+# A worker that exits within this many seconds of being forked counts as a failed boot
+WORKER_BOOT_WINDOW = 5
+# Give up after this many failed boots in a row instead of respawning forever
+MAX_BOOT_FAILURES = 5
+
+
+class ServerSettings:
+  host: str
+  port: int
+  workers: int
+  loop: str
+  http: str
+  backlog: int
+  keep_alive: int
+  graceful_timeout: int
+  access_log: bool
+
+  def __init__(self) -> None:
+    # Read at construction rather than import so a loaded .env is picked up
+    self.host = os.environ.get("APP_HOST", "0.0.0.0")
+    self.port = int(os.environ.get("APP_PORT", 8000))
+    # CPUs this process may run on, which respects affinity/cpusets unlike os.cpu_count()
+    self.workers = max(int(os.environ.get("WEB_WORKERS", len(os.sched_getaffinity(0)))), 1)
+    self.loop = os.environ.get("WEB_LOOP", "uvloop")
+    self.http = os.environ.get("WEB_HTTP", "httptools")
+    self.backlog = int(os.environ.get("WEB_BACKLOG", 2048))
+    self.keep_alive = int(os.environ.get("WEB_KEEP_ALIVE", 5))
+    # Must stay below the container's stop timeout (docker's default is 10s)
+    self.graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 8))
+    self.access_log = os.environ.get("WEB_ACCESS_LOG", "true").lower() in ("1", "true", "yes")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+  """Binds the listening socket once in the parent so every worker can share it
+
+  Args:
+      host (str): The interface to bind to
+      port (int): The port to bind to
+      backlog (int): Max number of pending connections for listen()
+
+  Returns:
+      socket.socket: The bound, listening socket
+  """
+  sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind((host, port))
+  sock.listen(backlog)
+  sock.set_inheritable(True)
+  return sock
+
+
+def load_config(config: uvicorn.Config) -> None:
+  """Validates the loop/http settings and loads the config in the parent,
+  so bad settings fail once here instead of in every forked worker
+
+  Args:
+      config (uvicorn.Config): The server config to validate and load
+
+  Raises:
+      SystemExit: Raises if the loop or http implementation is unknown or can't be imported
+  """
+  if config.loop not in LOOP_SETUPS:
+    logger.error("Invalid WEB_LOOP '%s', expected one of: %s", config.loop, ", ".join(LOOP_SETUPS))
+    sys.exit(1)
+  if config.http not in HTTP_PROTOCOLS:
+    logger.error("Invalid WEB_HTTP '%s', expected one of: %s", config.http, ", ".join(HTTP_PROTOCOLS))
+    sys.exit(1)
+
+  try:
+    if LOOP_SETUPS[config.loop] is not None:
+      import_from_string(LOOP_SETUPS[config.loop])
+    config.load()
+  except ImportFromStringError as e:
+    logger.error("Error loading server implementation: %s", e)
+    sys.exit(1)
+
+
+class WorkerServer(uvicorn.Server):
+  @contextlib.contextmanager
+  def capture_signals(self):
+    # Let the signals blocked around fork() through only once uvicorn's handlers are
+    # installed, so a shutdown that raced the spawn still ends in a graceful stop
+    with super().capture_signals():
+      signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+      yield
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+  """Runs a single uvicorn server on the shared socket. Called in the forked child.
+
+  Args:
+      config (uvicorn.Config): The server config built and loaded in the parent
+      sock (socket.socket): The shared listening socket
+
+  Raises:
+      SystemExit: STARTUP_FAILURE - Raises if the app's lifespan startup failed
+  """
+  # Pooled connections opened by the parent must not be reused across processes,
+  # close=False drops them from this pool without touching the parent's sockets
+  from .database import engine
+  engine.dispose(close=False)
+
+  # Drop the parent's handlers. uvicorn swaps in its own while serving and re-raises
+  # the caught signal after a graceful shutdown, which SIG_IGN turns into a clean exit
+  for sig in SHUTDOWN_SIGNALS:
+    signal.signal(sig, signal.SIG_IGN)
+
+  server = WorkerServer(config=config)
+  server.run(sockets=[sock])
+  if not server.started:
+    sys.exit(STARTUP_FAILURE)
+
+
+def spawn_worker(config: uvicorn.Config, sock: socket.socket, workers: dict[int, float]) -> None:
+  """Forks a new worker process and records its pid and start time in workers
+
+  Args:
+      config (uvicorn.Config): The server config built and loaded in the parent
+      sock (socket.socket): The shared listening socket
+      workers (dict[int, float]): Running workers, pid -> monotonic start time
+  """
+  # Block shutdown signals until the child has reset its handlers and the parent
+  # has recorded the pid, so neither process can act on a half-finished spawn
+  signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+  pid = os.fork()
+  if pid == 0:
+    exit_code = 0
+    try:
+      run_worker(config=config, sock=sock)
+    except SystemExit as e:
+      exit_code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+      traceback.print_exc()
+      exit_code = 1
+    finally:
+      os._exit(exit_code)
+
+  workers[pid] = time.monotonic()
+  signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+  logger.info("Started worker [%d]", pid)
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Multi-worker production server for the ToDo backend")
+  parser.add_argument("--env-file", default=".env", help="Env file to load, existing env vars take precedence. Defaults to .env")
+  return parser.parse_args()
+
+
+def main() -> None:
+  """Production entry point.
+
+  Preloads the app (and with it the JWT/hasher config and db tables) once in the
+  parent, then forks WEB_WORKERS uvicorn servers that share the listening socket.
+  Workers that die are replaced until the parent receives SIGINT/SIGTERM. Workers
+  that fail to boot are respawned with a backoff, and the server exits once they
+  fail MAX_BOOT_FAILURES times in a row or the app's startup fails.
+  """
+  args = parse_args()
+  load_dotenv(args.env_file)
+  settings = ServerSettings()
+
+  # Preload the app before forking so shared read-only state is built once
+  from .main import app
+  from .database import engine
+
+  # Don't carry the parent's pooled connections (from create_all) into the workers
+  engine.dispose()
+
+  config = uvicorn.Config(
+    app=app,
+    loop=settings.loop,
+    http=settings.http,
+    backlog=settings.backlog,
+    timeout_keep_alive=settings.keep_alive,
+    timeout_graceful_shutdown=settings.graceful_timeout,
+    proxy_headers=True,
+    access_log=settings.access_log,
+  )
+  load_config(config)
+  sock = bind_socket(host=settings.host, port=settings.port, backlog=settings.backlog)
+
+  workers: dict[int, float] = {}
+  shutting_down = False
+  exit_code = 0
+
+  def stop_workers():
+    for pid in list(workers):
+      try:
+        os.kill(pid, signal.SIGTERM)
+      except ProcessLookupError:
+        pass
+
+  def handle_shutdown(signum, frame):
+    nonlocal shutting_down
+    if not shutting_down:
+      logger.info("Received %s, stopping %d worker(s)", signal.Signals(signum).name, len(workers))
+    shutting_down = True
+    stop_workers()
+
+  signal.signal(signal.SIGINT, handle_shutdown)
+  signal.signal(signal.SIGTERM, handle_shutdown)
+
+  for _ in range(settings.workers):
+    spawn_worker(config=config, sock=sock, workers=workers)
+
+  logger.info("Serving on http://%s:%d with %d worker(s)", settings.host, settings.port, len(workers))
+
+  boot_failures = 0
+  while workers:
+    try:
+      pid, status = os.wait()
+    except ChildProcessError:
+      break
+    started_at = workers.pop(pid, None)
+    if started_at is None:
+      continue
+    worker_exit_code = os.waitstatus_to_exitcode(status)
+
+    if shutting_down:
+      logger.info("Worker [%d] stopped with exit code %d", pid, worker_exit_code)
+      continue
+
+    logger.warning("Worker [%d] died with exit code %d", pid, worker_exit_code)
+
+    if worker_exit_code == STARTUP_FAILURE:
+      # The app itself can't start, respawning won't help
+      logger.error("Worker [%d] failed to boot, shutting down", pid)
+      exit_code = STARTUP_FAILURE
+      shutting_down = True
+      stop_workers()
+      continue
+
+    if time.monotonic() - started_at < WORKER_BOOT_WINDOW:
+      boot_failures += 1
+    else:
+      boot_failures = 0
+
+    if boot_failures >= MAX_BOOT_FAILURES:
+      logger.error("Workers failed %d times in a row within %ds of starting, shutting down", boot_failures, WORKER_BOOT_WINDOW)
+      exit_code = 1
+      shutting_down = True
+      stop_workers()
+      continue
+
+    if boot_failures:
+      backoff = 2 ** (boot_failures - 1)
+      logger.info("Respawning worker in %ds", backoff)
+      time.sleep(backoff)
+      if shutting_down:
+        continue
+
+    spawn_worker(config=config, sock=sock, workers=workers)
+
+  sock.close()
+  sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+  main()